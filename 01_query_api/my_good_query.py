@@ -1,20 +1,25 @@
 import os
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 API_KEY = os.getenv("OPENAQ_API_KEY")
 
+# One pooled session so repeat calls reuse the HTTPS connection
+_SESSION = requests.Session()
+_SESSION.headers.update({"X-API-Key": API_KEY})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
 def fetch_gotham_latest():
     # Adding '/latest' turns a metadata link into a data link
     url = "https://api.openaq.org/v3/parameters/2/latest"
     
     # We ask for 20 rows to meet the assignment requirement
     params = {"limit": 20}
-    headers = {"X-API-Key": API_KEY}
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = _SESSION.get(url, params=params)
         response.raise_for_status() 
         data = response.json()
 
@@ -1,12 +1,21 @@
-import json
+import asyncio
 import os
-from typing import Dict, List, Tuple
+from string import Template
+from typing import Dict, List, Optional, Tuple
 
+import backoff
+import httpx
+import numpy as np
+import orjson
 import pandas as pd
 import requests
+import requests_cache
 import streamlit as st
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 
 # -----------------------------------------------------------------------------
 # 1. SETUP & CONFIGURATION
@@ -17,16 +26,42 @@ load_dotenv()
 OPENAQ_API_KEY = os.getenv("OPENAQ_API_KEY")
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")  # Updated variable name
 
-def configure_page() -> None:
-    st.set_page_config(
-        page_title="Gotham: NYC Air-Pulse",
-        page_icon="🏙️",
-        layout="wide",
+@st.cache_resource
+def get_http_session() -> requests_cache.CachedSession:
+    """
+    Shared HTTP session: keeps TCP/TLS connections to OpenAQ alive across reruns and
+    caches GET responses on disk (survives restarts; serves stale data if OpenAQ is down).
+    Expired entries that carry an ETag/Last-Modified are revalidated with
+    If-None-Match/If-Modified-Since, so an unchanged payload comes back as an empty 304.
+    Held in st.cache_resource because Streamlit re-executes this script on every rerun,
+    which would otherwise rebuild the pool and SQLite handle each time.
+    """
+    session = requests_cache.CachedSession(
+        "openaq_cache.sqlite",
+        backend="sqlite",
+        expire_after=600,
+        urls_expire_after={
+            "api.openaq.org/v3/*/latest": 60,
+            "api.openaq.org/v3/locations*": 3600,
+        },
+        allowable_methods=["GET"],
+        cache_control=True,
+        stale_if_error=True,
+    )
+    # Advertise every compression urllib3 can decode here (br/zstd when installed)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "X-API-Key": OPENAQ_API_KEY})
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=20,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+        ),
     )
+    return session
 
-    # CUSTOM CSS: Dark Mode "Gotham" Theme & Text Visibility Fixes
-    st.markdown(
-        """
+# CUSTOM CSS: Dark Mode "Gotham" Theme & Text Visibility Fixes
+_GOTHAM_CSS = """
         <style>
             /* Main Background - Dark Gotham Gradient */
             .stApp {
@@ -88,40 +123,50 @@ def configure_page() -> None:
             .advice-yellow { border-color: #ffcc00; }
             .advice-red { border-color: #ff3333; }
         </style>
-        """,
-        unsafe_allow_html=True,
+        """
+
+def configure_page() -> None:
+    st.set_page_config(
+        page_title="Gotham: NYC Air-Pulse",
+        page_icon="🏙️",
+        layout="wide",
     )
 
+    st.markdown(_GOTHAM_CSS, unsafe_allow_html=True)
+
+# Pollutant configuration: a module constant, so every call within a run shares one dict
+_POLLUTANT_CONFIG: Dict[str, Dict[str, any]] = {
+    "PM2.5 (Fine particulate matter)": {
+        "parameter_id": 2,
+        "unit": "µg/m³",
+        "clinical_title": "Why PM2.5 matters for Commuters",
+        "clinical_text": (
+            "PM2.5 particles are small enough to penetrate deep into the lungs. "
+            "For commuters, high levels mean that deep breathing (like during biking "
+            "or running) can increase exposure significantly.\n\n"
+            "- **Health Impact**: Triggers inflammation, asthma attacks, and cardiovascular stress.\n"
+            "- **Vulnerable Groups**: Cyclists, runners, and those waiting near busy roadway intersections."
+        ),
+    },
+    "O₃ (Ozone)": {
+        "parameter_id": 7,
+        "unit": "µg/m³",
+        "clinical_title": "Why Ozone matters for Commuters",
+        "clinical_text": (
+            "Ozone is a lung irritant often highest on hot, sunny afternoons. "
+            "It reacts with lung tissue like a sunburn inside your airways.\n\n"
+            "- **Health Impact**: Coughing, throat irritation, and reduced lung capacity.\n"
+            "- **Commuter Tip**: Ozone levels often drop in the early morning and late evening."
+        ),
+    },
+}
+
 def get_pollutant_config() -> Dict[str, Dict[str, any]]:
     """
     Configuration for pollutants, including API parameters and Clinical context.
     Parameter IDs: PM2.5 = 2, O3 = 7
     """
-    return {
-        "PM2.5 (Fine particulate matter)": {
-            "parameter_id": 2,
-            "unit": "µg/m³",
-            "clinical_title": "Why PM2.5 matters for Commuters",
-            "clinical_text": (
-                "PM2.5 particles are small enough to penetrate deep into the lungs. "
-                "For commuters, high levels mean that deep breathing (like during biking "
-                "or running) can increase exposure significantly.\n\n"
-                "- **Health Impact**: Triggers inflammation, asthma attacks, and cardiovascular stress.\n"
-                "- **Vulnerable Groups**: Cyclists, runners, and those waiting near busy roadway intersections."
-            ),
-        },
-        "O₃ (Ozone)": {
-            "parameter_id": 7,
-            "unit": "µg/m³",
-            "clinical_title": "Why Ozone matters for Commuters",
-            "clinical_text": (
-                "Ozone is a lung irritant often highest on hot, sunny afternoons. "
-                "It reacts with lung tissue like a sunburn inside your airways.\n\n"
-                "- **Health Impact**: Coughing, throat irritation, and reduced lung capacity.\n"
-                "- **Commuter Tip**: Ozone levels often drop in the early morning and late evening."
-            ),
-        },
-    }
+    return _POLLUTANT_CONFIG
 
 # -----------------------------------------------------------------------------
 # 2. LOGIC: DATA FETCHING & COMMUTER ADVICE
@@ -149,97 +194,228 @@ def get_commuter_advice(pollutant_key: str, value: float) -> Tuple[str, str]:
             
     return ("No specific data available.", "advice-yellow")
 
+def _giveup_unless_rate_limited(e: Exception) -> bool:
+    """
+    Only retry rate limits (429) and transport errors; other HTTP errors are final.
+    """
+    return isinstance(e, httpx.HTTPStatusError) and e.response.status_code != 429
+
+@backoff.on_exception(backoff.expo, httpx.HTTPError, max_tries=3, giveup=_giveup_unless_rate_limited)
+async def _fetch_latest(client: httpx.AsyncClient, loc_id: int) -> Optional[Dict]:
+    """
+    Fetch the latest measurement for a single OpenAQ location.
+    Transient failures (e.g. 429 rate limits) are retried with exponential backoff.
+    """
+    latest_url = f"https://api.openaq.org/v3/locations/{loc_id}/latest"
+    latest_params = {
+        "limit": 1,  # Just get the latest one
+        "page": 1,
+    }
+    response = await client.get(latest_url, params=latest_params)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+async def _gather_all(locations: List[Dict]) -> List:
+    """
+    Dispatch all /latest requests over one HTTP/2 client, multiplexed on a
+    single TCP+TLS connection instead of one connection per request.
+    At most 10 requests are in flight at once to stay under OpenAQ's rate limit.
+    Failed requests come back as exception objects instead of raising.
+    """
+    sem = asyncio.Semaphore(10)
+
+    async def _bounded(client: httpx.AsyncClient, loc: Dict):
+        async with sem:
+            try:
+                return await _fetch_latest(client, loc.get("id"))
+            except Exception as e:
+                # Keep one failed location from cancelling the whole task group
+                return e
+
+    async with httpx.AsyncClient(
+        http2=True,
+        headers={"X-API-Key": OPENAQ_API_KEY},
+        timeout=5,
+        limits=httpx.Limits(max_connections=10),
+    ) as client:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_bounded(client, loc)) for loc in locations]
+    return [task.result() for task in tasks]
+
+def _as_float(value) -> float:
+    """
+    Convert a possibly-missing JSON number to float, mapping None to NaN.
+    """
+    return np.nan if value is None else value
+
+def _allocate_columns(n: int) -> Dict[str, np.ndarray]:
+    """
+    Preallocate typed column arrays for up to n measurements.
+    """
+    return {
+        "Location": np.empty(n, dtype=object),
+        "Value": np.empty(n, dtype="float64"),
+        "Time": np.empty(n, dtype=object),
+        "latitude": np.empty(n, dtype="float64"),
+        "longitude": np.empty(n, dtype="float64"),
+    }
+
+def _fill_row(columns: Dict[str, np.ndarray], k: int, location_name: str, measurement: Dict, coords: Dict) -> None:
+    """
+    Write one measurement into row k of the preallocated columns.
+    """
+    datetime_obj = measurement.get("datetime") or {}
+    measurement_coords = measurement.get("coordinates") or coords
+
+    columns["Location"][k] = location_name
+    columns["Value"][k] = _as_float(measurement.get("value"))
+    columns["Time"][k] = datetime_obj.get("local") if isinstance(datetime_obj, dict) else None
+    columns["latitude"][k] = _as_float(measurement_coords.get("latitude") or coords.get("latitude"))
+    columns["longitude"][k] = _as_float(measurement_coords.get("longitude") or coords.get("longitude"))
+
+def _columns_to_frame(columns: Dict[str, np.ndarray], k: int, unit: str) -> pd.DataFrame:
+    """
+    Build the result DataFrame from the first k filled rows.
+    """
+    return pd.DataFrame({
+        "Location": columns["Location"][:k],
+        "Value": columns["Value"][:k],
+        "Unit": unit,
+        "Time": columns["Time"][:k],
+        "latitude": columns["latitude"][:k],
+        "longitude": columns["longitude"][:k],
+    })
+
+def _fetch_latest_per_location(locations: List[Dict], unit: str, raise_if_all_failed: bool = False) -> pd.DataFrame:
+    """
+    Fallback path: fetch latest measurements with one /latest request per location.
+    With raise_if_all_failed, raises OpenAQError when every request failed
+    instead of returning an empty frame.
+    """
+    max_locations = min(50, len(locations))  # Limit to 50 locations to avoid timeout
+    results = asyncio.run(_gather_all(locations[:max_locations]))
+    if raise_if_all_failed and results and all(isinstance(r, BaseException) for r in results):
+        raise OpenAQError(f"⚠️ API Error: {results[0]}")
+
+    columns = _allocate_columns(max_locations)
+    k = 0
+    for loc, latest_data in zip(locations[:max_locations], results):
+        # If latest fetch failed, skip this location
+        if isinstance(latest_data, BaseException) or not latest_data:
+            continue
+
+        location_id = loc.get("id")
+        location_name = loc.get("name", f"Location {location_id}")
+        coords = loc.get("coordinates") or {}
+
+        # Get the first measurement (should be for our parameter since we filtered locations)
+        measurements = latest_data.get("results", [])
+        if measurements:
+            _fill_row(columns, k, location_name, measurements[0], coords)
+            k += 1
+
+    return _columns_to_frame(columns, k, unit)
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _get_locations(lat: float, lon: float, radius_km: int, parameter_id: int) -> Dict:
+    """
+    Fetch the /v3/locations station list for an area and parameter.
+    Station metadata barely changes, so one copy is shared by every session
+    in this Streamlit process for an hour. Errors raise and are not cached.
+    """
+    locations_url = "https://api.openaq.org/v3/locations"
+    locations_params = {
+        "coordinates": f"{lat},{lon}",
+        "radius": radius_km * 1000,
+        "parameters_id": parameter_id,
+        "limit": 100,
+        "page": 1,
+    }
+    locations_response = get_http_session().get(locations_url, params=locations_params, timeout=10)
+    locations_response.raise_for_status()
+    return orjson.loads(locations_response.content)
+
+class OpenAQError(Exception):
+    """
+    A fetch failure with a message ready to show the user. Raised out of the
+    cached fetch so Streamlit doesn't cache it.
+    """
+
+@st.cache_data(ttl=300, show_spinner=False)
 def fetch_air_quality_data(lat: float, lon: float, radius_km: int, pollutant_key: str) -> Tuple[pd.DataFrame, Dict]:
     """
     Fetch latest measurements from OpenAQ API v3.
-    Uses /v3/locations endpoint with coordinates and parameters_id filter,
-    then fetches latest measurements for each location.
+    Uses /v3/locations endpoint with coordinates and parameters_id filter for
+    station names, then /v3/parameters/{id}/latest for all latest values at once.
+    Results are cached for 5 minutes (OpenAQ's update cadence); errors raise
+    OpenAQError, which is not cached, so the next rerun tries again.
     """
     config = get_pollutant_config()
     if pollutant_key not in config:
-        st.error(f"Invalid pollutant key: {pollutant_key}")
-        return pd.DataFrame(), {}
+        raise OpenAQError(f"Invalid pollutant key: {pollutant_key}")
     
     parameter_id = config[pollutant_key]["parameter_id"]
     unit = config[pollutant_key]["unit"]
     
-    headers = {}
     if not OPENAQ_API_KEY:
-        st.error("⚠️ OpenAQ API key is missing. Please set OPENAQ_API_KEY in your .env file.")
-        return pd.DataFrame(), {}
-    headers["X-API-Key"] = OPENAQ_API_KEY
-    
-    # Step 1: Get locations within radius that have this parameter
-    locations_url = "https://api.openaq.org/v3/locations"
-    locations_params = {
-        "coordinates": f"{lat},{lon}",
-        "radius": radius_km * 1000,
-        "parameters_id": parameter_id,
-        "limit": 100,
-        "page": 1,
-    }
+        raise OpenAQError("⚠️ OpenAQ API key is missing. Please set OPENAQ_API_KEY in your .env file.")
     
+    # Step 1: Get locations within radius that have this parameter (cached per process)
     try:
-        locations_response = requests.get(locations_url, params=locations_params, headers=headers, timeout=10)
-        locations_response.raise_for_status()
-        locations_data = locations_response.json()
+        locations_data = _get_locations(lat, lon, radius_km, parameter_id)
     except requests.exceptions.HTTPError as e:
         error_msg = f"⚠️ API Error: {e}"
-        if locations_response.status_code == 404:
+        if e.response.status_code == 404:
             error_msg += "\nEndpoint not found. Please verify your API key is valid."
-        elif locations_response.status_code == 422:
+        elif e.response.status_code == 422:
             error_msg += "\nInvalid parameters. Check coordinates and radius values."
-        st.error(error_msg)
-        return pd.DataFrame(), {}
+        raise OpenAQError(error_msg) from e
     except Exception as e:
-        st.error(f"⚠️ API Error: {e}")
-        return pd.DataFrame(), {}
+        raise OpenAQError(f"⚠️ API Error: {e}") from e
     
     locations = locations_data.get("results", [])
     if not locations:
         return pd.DataFrame(), {}
     
-    # Step 2: Fetch latest measurements for each location (limit to avoid too many calls)
-    records = []
-    max_locations = min(50, len(locations))  # Limit to 50 locations to avoid timeout
-    
-    for loc in locations[:max_locations]:
-        location_id = loc.get("id")
-        location_name = loc.get("name", f"Location {location_id}")
-        coords = loc.get("coordinates") or {}
-        
-        # Get latest measurements for this location
-        latest_url = f"https://api.openaq.org/v3/locations/{location_id}/latest"
-        latest_params = {
-            "limit": 1,  # Just get the latest one
-            "page": 1,
-        }
-        
-        try:
-            latest_response = requests.get(latest_url, params=latest_params, headers=headers, timeout=5)
-            latest_response.raise_for_status()
-            latest_data = latest_response.json()
-            
-            # Get the first measurement (should be for our parameter since we filtered locations)
-            measurements = latest_data.get("results", [])
-            if measurements:
-                measurement = measurements[0]
-                datetime_obj = measurement.get("datetime") or {}
-                measurement_coords = measurement.get("coordinates") or coords
-                
-                records.append({
-                    "Location": location_name,
-                    "Value": measurement.get("value"),
-                    "Unit": unit,
-                    "Time": datetime_obj.get("local") if isinstance(datetime_obj, dict) else None,
-                    "latitude": measurement_coords.get("latitude") or coords.get("latitude"),
-                    "longitude": measurement_coords.get("longitude") or coords.get("longitude"),
-                })
-        except Exception:
-            # If latest fetch fails, skip this location
-            continue
+    # Step 2: Fetch latest values for every station of this parameter in a single call
+    location_names = {loc.get("id"): loc.get("name", f"Location {loc.get('id')}") for loc in locations}
+    location_coords = {loc.get("id"): loc.get("coordinates") or {} for loc in locations}
+    latest_url = f"https://api.openaq.org/v3/parameters/{parameter_id}/latest"
+    latest_params = {
+        "coordinates": f"{lat},{lon}",
+        "radius": radius_km * 1000,
+        "limit": 1000,
+    }
+
+    seen_ids = set()
+    try:
+        latest_response = get_http_session().get(latest_url, params=latest_params, timeout=10)
+        latest_response.raise_for_status()
+        results = orjson.loads(latest_response.content).get("results", [])
+
+        columns = _allocate_columns(len(results))
+        k = 0
+        for record in results:
+            location_id = record.get("locationsId")
+            # Only keep stations returned by the radius-filtered /locations query, one row each
+            if location_id not in location_names or location_id in seen_ids:
+                continue
+            seen_ids.add(location_id)
+
+            _fill_row(columns, k, location_names[location_id], record, location_coords[location_id])
+            k += 1
+
+        df = _columns_to_frame(columns, k, unit)
+    except Exception:
+        df = None
+
+    # Stations the aggregated call didn't cover (all of them, if it failed) fall back to per-location requests
+    missing = locations if df is None else [loc for loc in locations if loc.get("id") not in seen_ids]
+    if missing:
+        # With no aggregated data, a total per-location failure must raise rather than cache an empty frame
+        per_location = _fetch_latest_per_location(missing, unit, raise_if_all_failed=df is None)
+        df = per_location if df is None else pd.concat([df, per_location], ignore_index=True)
     
-    df = pd.DataFrame.from_records(records)
     if not df.empty:
         df = df.dropna(subset=["latitude", "longitude"])
     
@@ -249,6 +425,65 @@ def fetch_air_quality_data(lat: float, lon: float, radius_km: int, pollutant_key
 # 3. GOOGLE MAPS RENDERING
 # -----------------------------------------------------------------------------
 
+# Static map page; only the key, center and markers are substituted per render
+_MAP_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+  <head>
+    <script src="https://maps.googleapis.com/maps/api/js?key=$api_key"></script>
+    <script>
+      function initMap() {
+        var center = {lat: $center_lat, lng: $center_lon};
+
+        // Dark Mode Styles for "Gotham" feel
+        var darkStyle = [
+          {elementType: 'geometry', stylers: [{color: '#242f3e'}]},
+          {elementType: 'labels.text.stroke', stylers: [{color: '#242f3e'}]},
+          {elementType: 'labels.text.fill', stylers: [{color: '#746855'}]},
+          {featureType: 'road', elementType: 'geometry', stylers: [{color: '#38414e'}]},
+          {featureType: 'road', elementType: 'geometry.stroke', stylers: [{color: '#212a37'}]},
+          {featureType: 'water', elementType: 'geometry', stylers: [{color: '#17263c'}]}
+        ];
+
+        var map = new google.maps.Map(document.getElementById('map'), {
+          zoom: 11,
+          center: center,
+          styles: darkStyle,
+          disableDefaultUI: true,
+        });
+
+        var infowindow = new google.maps.InfoWindow();
+        var markers = $markers;
+
+        markers.forEach(function(m) {
+           var marker = new google.maps.Marker({
+             position: {lat: m.lat, lng: m.lng},
+             map: map,
+             title: m.title
+           });
+
+           marker.addListener('click', function() {
+             infowindow.setContent(
+                '<div style="color:black; font-family:sans-serif;">' + 
+                '<b>' + m.title + '</b><br>' + 
+                'Pollution: ' + m.val + 
+                '</div>'
+             );
+             infowindow.open(map, marker);
+           });
+        });
+      }
+    </script>
+    <style>
+       #map { height: 500px; width: 100%; border-radius: 12px; }
+       body { margin: 0; padding: 0; background: transparent; }
+    </style>
+  </head>
+  <body onload="initMap()">
+    <div id="map"></div>
+  </body>
+</html>
+""")
+
 def render_google_map(df: pd.DataFrame, center_lat: float, center_lon: float):
     """
     Generates an HTML embed for Google Maps JavaScript API with Dark Mode styling.
@@ -261,86 +496,24 @@ def render_google_map(df: pd.DataFrame, center_lat: float, center_lon: float):
         st.error("Google Maps API key is missing. Please set GOOGLE_MAPS_API_KEY in your .env file.")
         return
 
-    # Create marker JS array
-    markers_js = ""
-    for _, row in df.iterrows():
-        # Properly escape JavaScript string (handle quotes, newlines, etc.)
-        loc_name = json.dumps(str(row['Location']))  # JSON encoding handles all escaping
-        val = row['Value']
-        unit = row['Unit']
-        # Handle NaN/None values
-        if pd.isna(val):
-            val_display = "N/A"
-        else:
-            val_display = f"{val} {unit}" if not pd.isna(unit) else str(val)
-        val_display_escaped = json.dumps(val_display)
-        
-        lat = row['latitude']
-        lon = row['longitude']
-        # Skip if coordinates are invalid
-        if pd.isna(lat) or pd.isna(lon):
-            continue
-            
-        markers_js += f"{{lat: {lat}, lng: {lon}, title: {loc_name}, val: {val_display_escaped}}},\n"
-
-    html_code = f"""
-    <!DOCTYPE html>
-    <html>
-      <head>
-        <script src="https://maps.googleapis.com/maps/api/js?key={GOOGLE_MAPS_API_KEY}"></script>
-        <script>
-          function initMap() {{
-            var center = {{lat: {center_lat}, lng: {center_lon}}};
-            
-            // Dark Mode Styles for "Gotham" feel
-            var darkStyle = [
-              {{elementType: 'geometry', stylers: [{{color: '#242f3e'}}]}},
-              {{elementType: 'labels.text.stroke', stylers: [{{color: '#242f3e'}}]}},
-              {{elementType: 'labels.text.fill', stylers: [{{color: '#746855'}}]}},
-              {{featureType: 'road', elementType: 'geometry', stylers: [{{color: '#38414e'}}]}},
-              {{featureType: 'road', elementType: 'geometry.stroke', stylers: [{{color: '#212a37'}}]}},
-              {{featureType: 'water', elementType: 'geometry', stylers: [{{color: '#17263c'}}]}}
-            ];
-
-            var map = new google.maps.Map(document.getElementById('map'), {{
-              zoom: 11,
-              center: center,
-              styles: darkStyle,
-              disableDefaultUI: true,
-            }});
-
-            var infowindow = new google.maps.InfoWindow();
-            var markers = [{markers_js}];
-
-            markers.forEach(function(m) {{
-               var marker = new google.maps.Marker({{
-                 position: {{lat: m.lat, lng: m.lng}},
-                 map: map,
-                 title: m.title
-               }});
-               
-               marker.addListener('click', function() {{
-                 infowindow.setContent(
-                    '<div style="color:black; font-family:sans-serif;">' + 
-                    '<b>' + m.title + '</b><br>' + 
-                    'Pollution: ' + m.val + 
-                    '</div>'
-                 );
-                 infowindow.open(map, marker);
-               }});
-            }});
-          }}
-        </script>
-        <style>
-           #map {{ height: 500px; width: 100%; border-radius: 12px; }}
-           body {{ margin: 0; padding: 0; background: transparent; }}
-        </style>
-      </head>
-      <body onload="initMap()">
-        <div id="map"></div>
-      </body>
-    </html>
-    """
+    # Drop rows without coordinates or a reading once, up front, so every
+    # remaining row is valid and the marker array can be built in one pass
+    m = df.dropna(subset=["latitude", "longitude", "Value"]).copy()
+    m["Unit"] = m["Unit"].fillna("")
+    m["Location"] = m["Location"].astype(str)
+    m["val_display"] = (m["Value"].astype(str) + " " + m["Unit"]).str.rstrip()
+    markers_payload = orjson.dumps(
+        m[["latitude", "longitude", "Location", "val_display"]]
+        .rename(columns={"latitude": "lat", "longitude": "lng", "Location": "title", "val_display": "val"})
+        .to_dict(orient="records")
+    ).decode()
+
+    html_code = _MAP_TEMPLATE.substitute(
+        api_key=GOOGLE_MAPS_API_KEY,
+        center_lat=center_lat,
+        center_lon=center_lon,
+        markers=markers_payload,
+    )
     
     components.html(html_code, height=520)
 
@@ -442,8 +615,12 @@ def main():
     lat, lon, radius, pollutant = render_sidebar()
 
     # Data Fetching
-    with st.spinner("Analyzing atmospheric data..."):
-        df, meta = fetch_air_quality_data(lat, lon, radius, pollutant)
+    try:
+        with st.spinner("Analyzing atmospheric data..."):
+            df, _ = fetch_air_quality_data(lat, lon, radius, pollutant)
+    except OpenAQError as e:
+        st.error(str(e))
+        df = pd.DataFrame()
 
     # Render UI
     render_dashboard(df, pollutant, lat, lon)
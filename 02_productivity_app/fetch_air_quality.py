@@ -1,6 +1,7 @@
 import os
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 # 1. Load the keys from your .env file into Python's memory
 load_dotenv()
@@ -8,17 +9,20 @@ load_dotenv()
 # 2. Grab your OpenAQ key using its name from the .env file
 API_KEY = os.getenv("OPENAQ_API_KEY")
 
+# 3. Reuse one pooled session so the HTTPS connection stays open between calls
+#    We pass your key in the session 'headers' so OpenAQ knows it's you
+_SESSION = requests.Session()
+_SESSION.headers.update({"X-API-Key": API_KEY})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
 def check_nyc_air():
     # The URL for the OpenAQ API (V3)
     url = "https://api.openaq.org/v3/locations?coordinates=40.7128,-74.0060&radius=5000"
-    
-    # We pass your key in the 'headers' so OpenAQ knows it's you
-    headers = {"X-API-Key": API_KEY}
 
-    # 3. Make the request
-    response = requests.get(url, headers=headers)
+    # 4. Make the request
+    response = _SESSION.get(url)
 
-    # 4. Check if it worked (200 = Success!)
+    # 5. Check if it worked (200 = Success!)
     if response.status_code == 200:
         print("✅ Connection Successful! Status Code: 200")
         data = response.json()
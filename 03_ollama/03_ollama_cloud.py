@@ -4,16 +4,21 @@
 # using your API key stored in the .env file
 
 # If you haven't already, install these packages...
-# pip install requests python-dotenv
+# pip install requests python-dotenv orjson ollama sqlite-vec
+# The semantic cache also needs a local embedding model:
+# ollama pull nomic-embed-text
 
 # Load libraries
 import requests  # For HTTP requests
-import json      # For working with JSON
+import orjson    # For fast JSON parsing
 import os        # For environment variables
+import sys       # For printing tokens as they stream in
+import sqlite3   # For the semantic cache database
+import time      # For cache expiry timestamps
+import ollama    # For local prompt embeddings
+from array import array  # For packing embeddings as float32 blobs
 from dotenv import load_dotenv  # For loading .env file
-
-# Starting message
-print("\n🚀 Querying Ollama Cloud in Python...\n")
+from requests.adapters import HTTPAdapter  # For connection pooling
 
 # Load environment variables from .env file
 # This reads the .env file and loads variables into the environment
@@ -22,50 +27,144 @@ load_dotenv()
 # Get API key from environment variable
 OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
 
-# Check if API key is set
-if not OLLAMA_API_KEY:
-    raise ValueError("OLLAMA_API_KEY not found in .env file. Please set it up first.")
+# Shared HTTP session so repeat requests reuse the TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
 
 # Ollama Cloud API endpoint
 url = "https://ollama.com/api/chat"
 
-# Construct the request body
-body = {
-    "model": "gpt-oss:20b-cloud",  # Low-cost cloud model
-    "messages": [
-        {
-            "role": "user",
-            "content": "Hello! Please respond with: Model is working."
-        }
-    ],
-    "stream": False  # Non-streaming response
-}
-
 # Set headers with API key
 headers = {
     "Authorization": f"Bearer {OLLAMA_API_KEY}",
     "Content-Type": "application/json"
 }
 
-# Send POST request to Ollama Cloud API
-response = requests.post(url, headers=headers, json=body)
-
-# Check if request was successful
-response.raise_for_status()
-
-# Parse the response JSON
-result = response.json()
-
-# Extract the model's reply
-output = result["message"]["content"]
-
-# Print the model's reply
-print("📝 Model Response:")
-print(output)
-print()
-
-# Closing message
-print("✅ Ollama Cloud query complete.\n")
-
-# Clear environment
-globals().clear()
\ No newline at end of file
+# Semantic cache settings
+# Prompts whose embeddings are within this cosine distance reuse a cached reply
+CACHE_PATH = "chat_cache.sqlite"
+CACHE_MAX_DISTANCE = 0.15
+CACHE_TTL_SECONDS = 24 * 60 * 60
+EMBED_MODEL = "nomic-embed-text"
+
+# Cache database connection; opened on first use, False if it can't be opened
+_db = None
+
+def _cache_db():
+    """Open the cache database with the sqlite-vec extension loaded.
+    Returns None if this Python's SQLite can't load extensions or sqlite-vec isn't installed."""
+    global _db
+    if _db is None:
+        try:
+            import sqlite_vec  # For vector distance functions in SQLite
+            # Look this up before connecting so unsupported builds don't leave an empty database file
+            enable_load_extension = sqlite3.Connection.enable_load_extension
+            db = sqlite3.connect(CACHE_PATH)
+            enable_load_extension(db, True)
+            sqlite_vec.load(db)
+            enable_load_extension(db, False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_cache ("
+                "embedding BLOB NOT NULL, content TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            _db = db
+        except (AttributeError, sqlite3.Error, ImportError):
+            _db = False
+    return _db or None
+
+def chat(prompt):
+    """Send a prompt to Ollama Cloud, printing the reply as it streams in.
+    Reuses the reply to any similar cached prompt."""
+    # Embed the prompt locally; skip the cache if it or the local model is unavailable
+    db = _cache_db()
+    emb_blob = None
+    if db is not None:
+        try:
+            emb = ollama.embed(model=EMBED_MODEL, input=prompt)["embeddings"][0]
+            emb_blob = array("f", emb).tobytes()  # Same float32 layout as sqlite_vec.serialize_float32
+        except Exception:
+            emb_blob = None
+
+    # Look for the closest unexpired cached prompt
+    if emb_blob is not None:
+        row = db.execute(
+            "SELECT content FROM chat_cache "
+            "WHERE expires_at > ? AND vec_distance_cosine(embedding, ?) < ? "
+            "ORDER BY vec_distance_cosine(embedding, ?) LIMIT 1",
+            (time.time(), emb_blob, CACHE_MAX_DISTANCE, emb_blob),
+        ).fetchone()
+        if row:
+            sys.stdout.write(row[0])
+            sys.stdout.flush()
+            return row[0]
+
+    # Construct the request body
+    body = {
+        "model": "gpt-oss:20b-cloud",  # Low-cost cloud model
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "stream": True  # Stream tokens as they are generated
+    }
+
+    # Send POST request to Ollama Cloud API
+    tokens = []
+    done = False
+    with _SESSION.post(url, headers=headers, json=body, stream=True) as response:
+        # Check if request was successful
+        response.raise_for_status()
+
+        # Each streamed line is a JSON chunk holding the next piece of the reply
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            # Failures after the stream has started arrive as an error line, not an HTTP status
+            if "error" in chunk:
+                raise RuntimeError(f"Ollama Cloud error: {chunk['error']}")
+            tok = chunk.get("message", {}).get("content", "")
+            tokens.append(tok)
+            sys.stdout.write(tok)
+            sys.stdout.flush()
+            if chunk.get("done"):
+                done = True
+                break
+    content = "".join(tokens)
+
+    # Store the reply so similar prompts can skip the cloud call; only complete, non-empty replies
+    if emb_blob is not None and done and content:
+        db.execute(
+            "INSERT INTO chat_cache (embedding, content, expires_at) VALUES (?, ?, ?)",
+            (emb_blob, content, time.time() + CACHE_TTL_SECONDS),
+        )
+        db.commit()
+
+    return content
+
+def main():
+    # Starting message
+    print("\n🚀 Querying Ollama Cloud in Python...\n")
+
+    # Check if API key is set
+    if not OLLAMA_API_KEY:
+        raise ValueError("OLLAMA_API_KEY not found in .env file. Please set it up first.")
+
+    # Query the model, printing the reply as it arrives
+    print("📝 Model Response:")
+    chat("Hello! Please respond with: Model is working.")
+    print()
+    print()
+
+    # Closing message
+    print("✅ Ollama Cloud query complete.\n")
+
+# Running as a script queries the model; importing only defines chat() and the shared session
+if __name__ == "__main__":
+    main()
+
+    # Drop references to the API key once we're done
+    OLLAMA_API_KEY = None
+    headers = None
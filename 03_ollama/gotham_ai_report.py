@@ -1,13 +1,25 @@
-import json
+import asyncio
 import os
-from typing import Dict, List, Tuple
-
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union
+
+import backoff
+import numpy as np
+import ollama
+import orjson
 import pandas as pd
 import requests
 import streamlit as st
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from rag_health_insights import get_rag_health_insights, format_rag_response
 
 # -----------------------------------------------------------------------------
@@ -20,6 +32,100 @@ GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
 
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Pooled HTTP session shared across reruns and sessions; reuses TCP/TLS connections.
+    The adapter retries only rate limits and gateway errors; transport errors are left to backoff in cached_get."""
+    session = requests.Session()
+    retry = Retry(total=3, connect=0, read=0, other=0, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retry))
+    if OPENAQ_API_KEY:
+        session.headers["X-API-Key"] = OPENAQ_API_KEY
+    return session
+
+# Page stylesheet, injected once per run by configure_page
+_CSS = """
+<style>
+    /* ── Base ── */
+    .stApp { background: radial-gradient(135deg, #1a1f35 0%, #050609 60%); }
+    h1, h2, h3, h4, h5, h6, p, li, span, div, label { color: #e0e0e0 !important; }
+
+    /* ── Sidebar ── */
+    section[data-testid="stSidebar"] {
+        background: linear-gradient(180deg, #0b0f1a 0%, #0f1520 100%);
+        border-right: 1px solid rgba(100, 120, 200, 0.15);
+    }
+    section[data-testid="stSidebar"] .stRadio label { font-size: 0.9rem; }
+
+    /* ── Metric cards ── */
+    .metric-card {
+        padding: 1.2rem 1.4rem; border-radius: 12px;
+        background: rgba(25, 30, 50, 0.7);
+        border: 1px solid rgba(255, 255, 255, 0.08);
+        margin-bottom: 0.8rem;
+        transition: border-color 0.2s;
+    }
+    .metric-card:hover { border-color: rgba(120, 140, 255, 0.3); }
+    .metric-label {
+        font-size: 0.75rem; text-transform: uppercase;
+        letter-spacing: 0.12em; color: #7a82a8 !important; margin-bottom: 0.4rem;
+    }
+    .metric-value { font-size: 1.9rem; font-weight: 700; color: #ffffff !important; line-height: 1.1; }
+    .metric-sub  { font-size: 0.78rem; color: #5a6080 !important; margin-top: 0.3rem; }
+
+    /* ── Advice boxes ── */
+    .advice-box {
+        padding: 1.4rem 1.6rem; border-radius: 10px;
+        background: rgba(255, 255, 255, 0.04);
+        border-left: 4px solid; margin-top: 1rem;
+    }
+    .advice-green  { border-color: #00d97e; background: rgba(0, 217, 126, 0.06); }
+    .advice-yellow { border-color: #f5c400; background: rgba(245, 196, 0, 0.06); }
+    .advice-red    { border-color: #ff4d4d; background: rgba(255, 77, 77, 0.06); }
+    .advice-ai     { border-color: #7c5cfc; background: rgba(124, 92, 252, 0.06); }
+
+    /* ── Hero header ── */
+    .hero-header {
+        padding: 1.6rem 0 1.2rem 0;
+        border-bottom: 1px solid rgba(255,255,255,0.07);
+        margin-bottom: 1.6rem;
+    }
+    .hero-title { font-size: 2.2rem !important; font-weight: 800 !important; letter-spacing: -0.02em; margin: 0 !important; }
+    .hero-sub   { color: #5a6488 !important; font-size: 0.95rem; margin-top: 0.3rem; }
+
+    /* ── AI table ── */
+    .ai-table { width: 100%; border-collapse: collapse; margin-top: 0.8rem; font-size: 0.92rem; }
+    .ai-table th { text-align: left; padding: 10px 14px; background: rgba(0,0,0,0.25); width: 22%; border-bottom: 1px solid #2e3450; color: #8891b5 !important; }
+    .ai-table td { padding: 10px 14px; border-bottom: 1px solid #1e2438; }
+    .ai-table tr:last-child td, .ai-table tr:last-child th { border-bottom: none; }
+
+    /* ── Badge ── */
+    .badge {
+        display: inline-block; padding: 2px 10px; border-radius: 20px;
+        font-size: 0.75rem; font-weight: 600; letter-spacing: 0.05em;
+    }
+    .badge-green  { background: rgba(0,217,126,0.15); color: #00d97e !important; }
+    .badge-yellow { background: rgba(245,196,0,0.15);  color: #f5c400 !important; }
+    .badge-red    { background: rgba(255,77,77,0.15);   color: #ff4d4d !important; }
+
+    /* ── Report card ── */
+    .report-card {
+        padding: 1.4rem 1.6rem; border-radius: 12px;
+        background: rgba(20, 25, 45, 0.8);
+        border: 1px solid rgba(255,255,255,0.08);
+        margin-bottom: 1rem;
+    }
+    .report-card h4 { margin: 0 0 0.6rem 0; font-size: 0.8rem; text-transform: uppercase; letter-spacing: 0.1em; color: #6a73a0 !important; }
+    .report-card p  { margin: 0; font-size: 1rem; line-height: 1.6; }
+    .report-risk    { font-size: 1.6rem; font-weight: 800; }
+    .risk-high      { color: #ff4d4d !important; }
+    .risk-moderate  { color: #f5c400 !important; }
+    .risk-low       { color: #00d97e !important; }
+    .location-row { display: flex; justify-content: space-between; padding: 0.5rem 0; border-bottom: 1px solid rgba(255,255,255,0.05); font-size: 0.9rem; }
+    .location-row:last-child { border-bottom: none; }
+</style>
+"""
+
 def configure_page() -> None:
     st.set_page_config(
         page_title="Gotham: NYC Air-Pulse",
@@ -27,239 +133,422 @@ def configure_page() -> None:
         layout="wide",
     )
 
-    st.markdown(
-        """
-        <style>
-            /* ── Base ── */
-            .stApp { background: radial-gradient(135deg, #1a1f35 0%, #050609 60%); }
-            h1, h2, h3, h4, h5, h6, p, li, span, div, label { color: #e0e0e0 !important; }
-
-            /* ── Sidebar ── */
-            section[data-testid="stSidebar"] {
-                background: linear-gradient(180deg, #0b0f1a 0%, #0f1520 100%);
-                border-right: 1px solid rgba(100, 120, 200, 0.15);
-            }
-            section[data-testid="stSidebar"] .stRadio label { font-size: 0.9rem; }
-
-            /* ── Metric cards ── */
-            .metric-card {
-                padding: 1.2rem 1.4rem; border-radius: 12px;
-                background: rgba(25, 30, 50, 0.7);
-                border: 1px solid rgba(255, 255, 255, 0.08);
-                margin-bottom: 0.8rem;
-                transition: border-color 0.2s;
-            }
-            .metric-card:hover { border-color: rgba(120, 140, 255, 0.3); }
-            .metric-label {
-                font-size: 0.75rem; text-transform: uppercase;
-                letter-spacing: 0.12em; color: #7a82a8 !important; margin-bottom: 0.4rem;
-            }
-            .metric-value { font-size: 1.9rem; font-weight: 700; color: #ffffff !important; line-height: 1.1; }
-            .metric-sub  { font-size: 0.78rem; color: #5a6080 !important; margin-top: 0.3rem; }
-
-            /* ── Advice boxes ── */
-            .advice-box {
-                padding: 1.4rem 1.6rem; border-radius: 10px;
-                background: rgba(255, 255, 255, 0.04);
-                border-left: 4px solid; margin-top: 1rem;
-            }
-            .advice-green  { border-color: #00d97e; background: rgba(0, 217, 126, 0.06); }
-            .advice-yellow { border-color: #f5c400; background: rgba(245, 196, 0, 0.06); }
-            .advice-red    { border-color: #ff4d4d; background: rgba(255, 77, 77, 0.06); }
-            .advice-ai     { border-color: #7c5cfc; background: rgba(124, 92, 252, 0.06); }
-
-            /* ── Hero header ── */
-            .hero-header {
-                padding: 1.6rem 0 1.2rem 0;
-                border-bottom: 1px solid rgba(255,255,255,0.07);
-                margin-bottom: 1.6rem;
-            }
-            .hero-title { font-size: 2.2rem !important; font-weight: 800 !important; letter-spacing: -0.02em; margin: 0 !important; }
-            .hero-sub   { color: #5a6488 !important; font-size: 0.95rem; margin-top: 0.3rem; }
-
-            /* ── AI table ── */
-            .ai-table { width: 100%; border-collapse: collapse; margin-top: 0.8rem; font-size: 0.92rem; }
-            .ai-table th { text-align: left; padding: 10px 14px; background: rgba(0,0,0,0.25); width: 22%; border-bottom: 1px solid #2e3450; color: #8891b5 !important; }
-            .ai-table td { padding: 10px 14px; border-bottom: 1px solid #1e2438; }
-            .ai-table tr:last-child td, .ai-table tr:last-child th { border-bottom: none; }
-
-            /* ── Badge ── */
-            .badge {
-                display: inline-block; padding: 2px 10px; border-radius: 20px;
-                font-size: 0.75rem; font-weight: 600; letter-spacing: 0.05em;
-            }
-            .badge-green  { background: rgba(0,217,126,0.15); color: #00d97e !important; }
-            .badge-yellow { background: rgba(245,196,0,0.15);  color: #f5c400 !important; }
-            .badge-red    { background: rgba(255,77,77,0.15);   color: #ff4d4d !important; }
-
-            /* ── Report card ── */
-            .report-card {
-                padding: 1.4rem 1.6rem; border-radius: 12px;
-                background: rgba(20, 25, 45, 0.8);
-                border: 1px solid rgba(255,255,255,0.08);
-                margin-bottom: 1rem;
-            }
-            .report-card h4 { margin: 0 0 0.6rem 0; font-size: 0.8rem; text-transform: uppercase; letter-spacing: 0.1em; color: #6a73a0 !important; }
-            .report-card p  { margin: 0; font-size: 1rem; line-height: 1.6; }
-            .report-risk    { font-size: 1.6rem; font-weight: 800; }
-            .risk-high      { color: #ff4d4d !important; }
-            .risk-moderate  { color: #f5c400 !important; }
-            .risk-low       { color: #00d97e !important; }
-            .location-row { display: flex; justify-content: space-between; padding: 0.5rem 0; border-bottom: 1px solid rgba(255,255,255,0.05); font-size: 0.9rem; }
-            .location-row:last-child { border-bottom: none; }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(_CSS, unsafe_allow_html=True)
+
+_POLLUTANT_CONFIG: Dict[str, Dict[str, any]] = {
+    "PM2.5 (Fine particulate matter)": {
+        "parameter_id": 2,
+        "unit": "µg/m³",
+        "clinical_title": "Why PM2.5 matters for Commuters",
+        "clinical_text": "PM2.5 particles penetrate deep into the lungs. High levels mean deep breathing can increase exposure significantly.\n\n- **Health Impact**: Triggers inflammation and asthma.\n- **Vulnerable Groups**: Cyclists and runners.",
+    },
+    "O₃ (Ozone)": {
+        "parameter_id": 7,
+        "unit": "µg/m³",
+        "clinical_title": "Why Ozone matters for Commuters",
+        "clinical_text": "Ozone is a lung irritant highest on sunny afternoons.\n\n- **Health Impact**: Coughing and throat irritation.\n- **Commuter Tip**: Levels drop in the early morning.",
+    },
+}
 
 def get_pollutant_config() -> Dict[str, Dict[str, any]]:
-    return {
-        "PM2.5 (Fine particulate matter)": {
-            "parameter_id": 2,
-            "unit": "µg/m³",
-            "clinical_title": "Why PM2.5 matters for Commuters",
-            "clinical_text": "PM2.5 particles penetrate deep into the lungs. High levels mean deep breathing can increase exposure significantly.\n\n- **Health Impact**: Triggers inflammation and asthma.\n- **Vulnerable Groups**: Cyclists and runners.",
-        },
-        "O₃ (Ozone)": {
-            "parameter_id": 7,
-            "unit": "µg/m³",
-            "clinical_title": "Why Ozone matters for Commuters",
-            "clinical_text": "Ozone is a lung irritant highest on sunny afternoons.\n\n- **Health Impact**: Coughing and throat irritation.\n- **Commuter Tip**: Levels drop in the early morning.",
-        },
-    }
+    return _POLLUTANT_CONFIG
 
 # -----------------------------------------------------------------------------
 # 2. LOGIC: DATA FETCHING & AI INTEGRATION
 # -----------------------------------------------------------------------------
 
-def get_commuter_advice(pollutant_key: str, value: float) -> Tuple[str, str]:
-    if "PM2.5" in pollutant_key:
-        if value < 12: return ("✅ **Green Light:** Air is clean. Safe for biking or walking.", "advice-green")
-        elif value < 35.4: return ("⚠️ **Caution:** Moderate particles. Wear a mask near heavy traffic.", "advice-yellow")
-        else: return ("🛑 **Hazard:** High pollution. Avoid outdoor exertion.", "advice-red")
-    elif "O₃" in pollutant_key:
-        if value < 54: return ("✅ **Green Light:** Ozone levels are low.", "advice-green")
-        elif value < 70: return ("⚠️ **Caution:** Rising ozone. Carry a rescue inhaler.", "advice-yellow")
-        else: return ("🛑 **Hazard:** High Ozone. Limit time outdoors.", "advice-red")
-    return ("No specific data available.", "advice-yellow")
-
-def get_ai_insights(df: pd.DataFrame, pollutant_key: str, ai_choice: str) -> str:
-    if df.empty:
-        return '{"error": "Not enough data for AI analysis."}'
+# Advice thresholds: readings below the first bound are green, below the second yellow, else red
+_PM25_BINS = np.array([12, 35.4])
+_O3_BINS = np.array([54, 70])
+_PM25_LABELS = [
+    ("✅ **Green Light:** Air is clean. Safe for biking or walking.", "advice-green"),
+    ("⚠️ **Caution:** Moderate particles. Wear a mask near heavy traffic.", "advice-yellow"),
+    ("🛑 **Hazard:** High pollution. Avoid outdoor exertion.", "advice-red"),
+]
+_O3_LABELS = [
+    ("✅ **Green Light:** Ozone levels are low.", "advice-green"),
+    ("⚠️ **Caution:** Rising ozone. Carry a rescue inhaler.", "advice-yellow"),
+    ("🛑 **Hazard:** High Ozone. Limit time outdoors.", "advice-red"),
+]
+_ADVICE_CLASSES = ["advice-green", "advice-yellow", "advice-red"]
+
+def _advice_bins(pollutant_key: str):
+    if "PM2.5" in pollutant_key: return _PM25_BINS, _PM25_LABELS
+    if "O₃" in pollutant_key: return _O3_BINS, _O3_LABELS
+    return None, None
 
-    summary_data = df[['Location', 'Value', 'Unit']].head(5).to_dict('records')
+def get_commuter_advice(pollutant_key: str, value: float) -> Tuple[str, str]:
+    bins, labels = _advice_bins(pollutant_key)
+    if bins is None:
+        return ("No specific data available.", "advice-yellow")
+    return labels[np.searchsorted(bins, value, side="right")]
+
+def classify_series(values: pd.Series, pollutant_key: str) -> pd.Series:
+    """Advice CSS class for every reading in a column, binned in one vectorized pass."""
+    bins, _ = _advice_bins(pollutant_key)
+    if bins is None:
+        return pd.Series("advice-yellow", index=values.index)
+    return pd.cut(values, bins=[-np.inf, *bins, np.inf], right=False, labels=_ADVICE_CLASSES)
+
+_OPENAI_CHOICE = "OpenAI (GPT-4o)"
+_OLLAMA_CHOICE = "Ollama (gemma3:latest)"
+
+def get_ai_insights(df: pd.DataFrame, pollutant_key: str, ai_choice: Union[str, List[str]], placeholder=None) -> Union[str, List[str]]:
+    """Query one model, or several concurrently when ai_choice is a list (one reply per choice).
+    A lone GPT-4o request streams its reply into placeholder while it is generated."""
+    choices = [ai_choice] if isinstance(ai_choice, str) else list(ai_choice)
+    # Stations without a reading are kept as NaN; aggregate only the real values
+    values = df['Value'].dropna() if 'Value' in df else pd.Series(dtype='float32')
+    if values.empty:
+        replies = {c: '{"error": "Not enough data for AI analysis."}' for c in choices}
+        return replies[ai_choice] if isinstance(ai_choice, str) else [replies[c] for c in choices]
+
+    # Aggregates instead of raw rows keep the prompt short
+    summary = {
+        'mean': round(float(values.mean()), 1),
+        'max': round(float(values.max()), 1),
+        'min': round(float(values.min()), 1),
+        'n': len(values),
+        'unit': df['Unit'].iloc[0],
+        'top_hotspot': df.loc[values.idxmax(), 'Location'],
+    }
     
     # NEW PROMPT: Enforcing JSON schema
     prompt = (
-        f"Act as an environmental health specialist in NYC. Analyze this current {pollutant_key} data: {summary_data}. "
+        f"Act as an environmental health specialist in NYC. Analyze this current {pollutant_key} data: {summary}. "
         "You MUST return a valid JSON object with EXACTLY these three keys: "
         "'risk_level' (String: Low, Moderate, High, or Severe), "
         "'summary' (String: 2 sentences on immediate health risks for commuters), "
         "'actionable_tip' (String: 1 strict, direct recommendation)."
     )
 
-    if ai_choice == "OpenAI (GPT-4o)":
-        if not OPENAI_API_KEY:
-            return '{"error": "OpenAI API key is missing. Check your .env file."}'
+    replies, pending = {}, []
+    for choice in choices:
+        if choice == _OPENAI_CHOICE and not OPENAI_API_KEY:
+            replies[choice] = '{"error": "OpenAI API key is missing. Check your .env file."}'
+        elif choice not in (_OPENAI_CHOICE, _OLLAMA_CHOICE):
+            replies[choice] = '{"error": "Invalid AI configuration."}'
+        else:
+            pending.append(choice)
+
+    if pending:
         try:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}, # FORCES JSON
-                max_tokens=200
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f'{{"error": "OpenAI Error: {str(e)}"}}'
-
-    elif ai_choice == "Ollama (gemma3:latest)":
-        url = "http://localhost:11434/api/generate"
-        payload = {
-            "model": "gemma3:latest",
-            "prompt": prompt,
-            "stream": False,
-            "format": "json" # FORCES JSON IN OLLAMA
-        }
-        headers = {"Authorization": f"Bearer {OLLAMA_API_KEY}"} if OLLAMA_API_KEY else {}
+            if placeholder is not None and pending == [_OPENAI_CHOICE]:
+                fetched = [_openai_stream(prompt, placeholder)]
+            else:
+                fetched = _cached_ai(prompt, tuple(pending))
+        except _AIRequestFailed as e:
+            fetched = e.replies
+        replies.update(zip(pending, fetched))
+
+    return replies[ai_choice] if isinstance(ai_choice, str) else [replies[c] for c in choices]
+
+class _AIRequestFailed(Exception):
+    """Carries per-model replies out of _cached_ai so a failed call is not cached."""
+    def __init__(self, replies: List[str]):
+        super().__init__("AI request failed")
+        self.replies = replies
+
+def _ai_error(ai_choice: str, e: BaseException) -> str:
+    source = "OpenAI" if ai_choice == _OPENAI_CHOICE else "Ollama"
+    return f'{{"error": "{source} Error: {str(e)}"}}'
+
+@st.cache_resource
+def _ai_loop() -> asyncio.AbstractEventLoop:
+    """Long-lived event loop on a background thread, so async clients outlive a single rerun."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+@st.cache_resource
+def get_openai_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+@st.cache_resource
+def get_ollama_client() -> ollama.AsyncClient:
+    """Keep-alive Ollama client; only ever awaited on the background AI loop."""
+    headers = {"Authorization": f"Bearer {OLLAMA_API_KEY}"} if OLLAMA_API_KEY else None
+    return ollama.AsyncClient(host="http://localhost:11434", headers=headers)
+
+async def _ask_openai(client: AsyncOpenAI, prompt: str) -> str:
+    response = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": prompt}],
+        response_format={"type": "json_object"}, # FORCES JSON
+        max_tokens=120
+    )
+    return response.choices[0].message.content
+
+async def _stream_openai(client: AsyncOpenAI, prompt: str, chunks: queue.Queue) -> None:
+    """Push reply deltas onto chunks as they arrive; None marks the end of the stream."""
+    try:
+        stream = await client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            max_tokens=120,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                chunks.put(chunk.choices[0].delta.content or "")
+    finally:
+        chunks.put(None)
+
+async def _ask_ollama(client: ollama.AsyncClient, prompt: str) -> str:
+    response = await client.generate(
+        model="gemma3:latest",
+        prompt=prompt,
+        format="json", # FORCES JSON IN OLLAMA
+        stream=False,
+    )
+    return response["response"] or '{"error": "No response from local model."}'
+
+async def _ai_async(prompt: str, ai_choices: Tuple[str, ...], openai_client: Optional[AsyncOpenAI], ollama_client: Optional[ollama.AsyncClient]) -> List:
+    return await asyncio.gather(
+        *[_ask_openai(openai_client, prompt) if c == _OPENAI_CHOICE else _ask_ollama(ollama_client, prompt) for c in ai_choices],
+        return_exceptions=True,
+    )
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_ai(prompt: str, ai_choices: Tuple[str, ...]) -> List[str]:
+    """Query the selected models concurrently; identical prompts within 5 minutes reuse the replies. Failures are not cached."""
+    # Only build the clients that are needed; AsyncOpenAI refuses to start without a key
+    openai_client = get_openai_client() if _OPENAI_CHOICE in ai_choices else None
+    ollama_client = get_ollama_client() if _OLLAMA_CHOICE in ai_choices else None
+    future = asyncio.run_coroutine_threadsafe(_ai_async(prompt, ai_choices, openai_client, ollama_client), _ai_loop())
+    results = future.result()
+    replies = [_ai_error(c, r) if isinstance(r, BaseException) else r for c, r in zip(ai_choices, results)]
+    if any(isinstance(r, BaseException) for r in results):
+        raise _AIRequestFailed(replies)
+    return replies
+
+_STREAM_TTL_SECONDS = 300
+
+class _ReplyStore:
+    """Finished replies by prompt with an expiry time. Shared by every session thread, so access is locked."""
+    def __init__(self, ttl: float = _STREAM_TTL_SECONDS):
+        self._entries: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._ttl = ttl
+
+    def get(self, prompt: str) -> Optional[str]:
+        with self._lock:
+            hit = self._entries.get(prompt)
+        return hit[1] if hit and hit[0] > time.monotonic() else None
+
+    def put(self, prompt: str, reply: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+            self._entries[prompt] = (now + self._ttl, reply)
+
+@st.cache_resource
+def _streamed_replies() -> _ReplyStore:
+    """Finished GPT-4o replies, shared across reruns; kept outside st.cache_data,
+    which would try to replay the placeholder writes on a cache hit."""
+    return _ReplyStore()
+
+def _openai_stream(prompt: str, placeholder) -> str:
+    """Stream GPT-4o into the placeholder as tokens arrive, reusing a reply from the last 5 minutes.
+    Falls back to a single blocking call if streaming fails; failures are not stored."""
+    store = _streamed_replies()
+    cached = store.get(prompt)
+    if cached is not None:
+        return cached
+
+    chunks: queue.Queue = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(_stream_openai(get_openai_client(), prompt, chunks), _ai_loop())
+    buf = ""
+    for delta in iter(chunks.get, None):
+        buf += delta
+        placeholder.code(buf, language="json")
+    try:
+        future.result()
+        reply = buf
+    except Exception:
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json().get("response", '{"error": "No response from local model."}')
+            reply = asyncio.run_coroutine_threadsafe(_ask_openai(get_openai_client(), prompt), _ai_loop()).result()
         except Exception as e:
-            return f'{{"error": "Ollama Error: {str(e)}"}}'
-
-    return '{"error": "Invalid AI configuration."}'
+            raise _AIRequestFailed([_ai_error(_OPENAI_CHOICE, e)])
+
+    store.put(prompt, reply)
+    return reply
+
+class _ValidatorStore:
+    """Validators and body of recent OpenAQ responses, least recently used evicted first.
+    Shared by the per-location worker threads, so access is locked."""
+    def __init__(self, maxsize: int = 256):
+        self._entries: "OrderedDict[Tuple, Tuple[Dict[str, str], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+
+    def get(self, key: Tuple) -> Tuple[Dict[str, str], bytes]:
+        with self._lock:
+            if key not in self._entries:
+                return {}, b""
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Tuple, validators: Dict[str, str], body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (validators, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_validator_store() -> _ValidatorStore:
+    """Kept in st.cache_resource so conditional GETs still have validators once st.cache_data expires;
+    a module global would be rebuilt on every rerun of the script."""
+    return _ValidatorStore()
+
+def _giveup_on_client_error(e: requests.RequestException) -> bool:
+    """Retry transport errors and 5xx; other HTTP errors, and statuses the adapter already retried, are final."""
+    if isinstance(e, requests.exceptions.RetryError):
+        return True
+    response = e.response
+    return response is not None and response.status_code < 500 and response.status_code != 429
+
+@backoff.on_exception(backoff.expo, requests.RequestException, max_tries=3, giveup=_giveup_on_client_error)
+def cached_get(session: requests.Session, store: _ValidatorStore, url: str, params: Optional[Dict] = None, timeout: float = 10) -> bytes:
+    """GET url with If-None-Match/If-Modified-Since from the previous response; a 304 returns the stored body."""
+    key = (url, tuple(sorted((params or {}).items())))
+    validators, body = store.get(key)
+    response = session.get(url, params=params, headers=validators, timeout=timeout)
+    if response.status_code == 304 and body:
+        return body
+    response.raise_for_status()
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["If-None-Match"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["If-Modified-Since"] = response.headers["Last-Modified"]
+    if validators:
+        store.put(key, validators, response.content)
+    return response.content
+
+def _fetch_location_latest(session: requests.Session, store: _ValidatorStore, loc_id: int) -> Optional[Dict]:
+    body = cached_get(session, store, f"https://api.openaq.org/v3/locations/{loc_id}/latest", params={"limit": 1}, timeout=5)
+    measurements = orjson.loads(body).get("results", [])
+    return measurements[0] if measurements else None
+
+def _fetch_latest(session: requests.Session, store: _ValidatorStore, loc: Dict) -> Union[Dict, None, Exception]:
+    """Latest measurement for one location (None if it has none), or the exception once retries are exhausted."""
+    try:
+        return _fetch_location_latest(session, store, loc.get("id"))
+    except Exception as e:
+        return e
 
+@st.cache_data(ttl=600, show_spinner=False)
 def fetch_air_quality_data(lat: float, lon: float, radius_km: int, pollutant_key: str) -> Tuple[pd.DataFrame, Dict]:
+    """Latest readings around (lat, lon). Raises if OpenAQ can't be reached, so a failed fetch is never cached."""
     config = get_pollutant_config()
     if pollutant_key not in config: return pd.DataFrame(), {}
-    
+
     parameter_id = config[pollutant_key]["parameter_id"]
     unit = config[pollutant_key]["unit"]
-    
-    headers = {"X-API-Key": OPENAQ_API_KEY} if OPENAQ_API_KEY else {}
+
+    session = get_http_session()
+    store = get_validator_store()
     locations_url = "https://api.openaq.org/v3/locations"
     locations_params = {"coordinates": f"{lat},{lon}", "radius": radius_km * 1000, "parameters_id": parameter_id, "limit": 100, "page": 1}
-    
+
+    locations = orjson.loads(cached_get(session, store, locations_url, locations_params)).get("results", [])[:50]
+
+    # One bulk request for every station's latest value; per-location requests fill in the rest
+    latest_by_location: Dict = {}
     try:
-        locations_response = requests.get(locations_url, params=locations_params, headers=headers, timeout=10)
-        locations_response.raise_for_status()
-        locations = locations_response.json().get("results", [])
+        latest_body = cached_get(
+            session,
+            store,
+            f"https://api.openaq.org/v3/parameters/{parameter_id}/latest",
+            {"coordinates": f"{lat},{lon}", "radius": radius_km * 1000, "limit": 1000},
+        )
+        for m in orjson.loads(latest_body).get("results", []):
+            latest_by_location.setdefault(m.get("locationsId"), m)
     except Exception:
-        return pd.DataFrame(), {}
-    
-    records = []
-    for loc in locations[:50]:
+        latest_by_location = {}
+
+    # Stations the bulk call didn't cover (all of them, if it failed) are fetched one by one.
+    # Blocking I/O releases the GIL, so threads over the pooled session run the requests in parallel
+    missing = [loc for loc in locations if loc.get("id") not in latest_by_location]
+    if missing:
+        with ThreadPoolExecutor(max_workers=20) as ex:
+            latest = list(ex.map(partial(_fetch_latest, session, store), missing))
+        if not latest_by_location and all(isinstance(m, Exception) for m in latest):
+            raise latest[0]
+        latest_by_location.update((loc.get("id"), m) for loc, m in zip(missing, latest) if isinstance(m, dict))
+
+    # Columns are collected as parallel lists so pandas doesn't have to transpose row dicts
+    locs, vals, times, lats, lons = [], [], [], [], []
+    for loc in locations:
         location_id = loc.get("id")
+        m = latest_by_location.get(location_id)
         coords = loc.get("coordinates") or {}
-        try:
-            latest_response = requests.get(f"https://api.openaq.org/v3/locations/{location_id}/latest", params={"limit": 1}, headers=headers, timeout=5)
-            measurements = latest_response.json().get("results", [])
-            if measurements:
-                m = measurements[0]
-                records.append({
-                    "Location": loc.get("name", f"Loc {location_id}"),
-                    "Value": m.get("value"),
-                    "Unit": unit,
-                    "Time": m.get("datetime", {}).get("local"),
-                    "latitude": coords.get("latitude"),
-                    "longitude": coords.get("longitude"),
-                })
-        except Exception: continue
-    
-    df = pd.DataFrame.from_records(records).dropna(subset=["latitude", "longitude"]) if records else pd.DataFrame()
+        if m and coords.get("latitude") is not None and coords.get("longitude") is not None:
+            locs.append(loc.get("name", f"Loc {location_id}"))
+            vals.append(m.get("value"))
+            times.append(m.get("datetime", {}).get("local"))
+            lats.append(coords.get("latitude"))
+            lons.append(coords.get("longitude"))
+
+    df = pd.DataFrame({
+        "Location": locs,
+        "Value": np.asarray(vals, dtype=np.float32),
+        "Unit": [unit] * len(locs),
+        "Time": times,
+        "latitude": np.asarray(lats, dtype=np.float32),
+        "longitude": np.asarray(lons, dtype=np.float32),
+    })
     return df, {}
 
 # -----------------------------------------------------------------------------
 # 3. GOOGLE MAPS RENDERING
 # -----------------------------------------------------------------------------
-def render_google_map(df: pd.DataFrame, center_lat: float, center_lon: float):
-    if df.empty or not GOOGLE_MAPS_API_KEY: return
-    markers_js = "".join([
-       f"""{{lat: {r['latitude']}, lng: {r['longitude']}, title: {json.dumps(str(r['Location']))}, val: {json.dumps(f"{r['Value']} {r['Unit']}")} }},\n"""
-        for _, r in df.iterrows() if not pd.isna(r['latitude'])
-    ])
-
-    html_code = f"""
+# Static map page; the key, center and marker JSON are spliced into the placeholders
+_MAP_TEMPLATE = """
     <!DOCTYPE html><html><head>
-    <script src="https://maps.googleapis.com/maps/api/js?key={GOOGLE_MAPS_API_KEY}"></script>
+    <script src="https://maps.googleapis.com/maps/api/js?key=<!--API_KEY-->"></script>
     <script>
-      function initMap() {{
-        var map = new google.maps.Map(document.getElementById('map'), {{
-          zoom: 11, center: {{lat: {center_lat}, lng: {center_lon}}}, disableDefaultUI: true,
-          styles: [{{elementType: 'geometry', stylers: [{{color: '#242f3e'}}]}}, {{elementType: 'labels.text.fill', stylers: [{{color: '#746855'}}]}}, {{featureType: 'water', elementType: 'geometry', stylers: [{{color: '#17263c'}}]}}]
-        }});
+      function initMap() {
+        var map = new google.maps.Map(document.getElementById('map'), {
+          zoom: 11, center: <!--CENTER-->, disableDefaultUI: true,
+          styles: [{elementType: 'geometry', stylers: [{color: '#242f3e'}]}, {elementType: 'labels.text.fill', stylers: [{color: '#746855'}]}, {featureType: 'water', elementType: 'geometry', stylers: [{color: '#17263c'}]}]
+        });
         var infowindow = new google.maps.InfoWindow();
-        [{markers_js}].forEach(function(m) {{
-           var marker = new google.maps.Marker({{position: {{lat: m.lat, lng: m.lng}}, map: map, title: m.title}});
-           marker.addListener('click', function() {{ infowindow.setContent('<div style="color:black;"><b>' + m.title + '</b><br>Pollution: ' + m.val + '</div>'); infowindow.open(map, marker); }});
-        }});
-      }}
-    </script><style>#map {{ height: 500px; width: 100%; border-radius: 12px; }} body {{ margin: 0; }}</style>
+        <!--MARKERS-->.forEach(function(m) {
+           var marker = new google.maps.Marker({position: {lat: m.lat, lng: m.lng}, map: map, title: m.title});
+           marker.addListener('click', function() { infowindow.setContent('<div style="color:black;"><b>' + m.title + '</b><br>Pollution: ' + m.val + '</div>'); infowindow.open(map, marker); });
+        });
+      }
+    </script><style>#map { height: 500px; width: 100%; border-radius: 12px; } body { margin: 0; }</style>
     </head><body onload="initMap()"><div id="map"></div></body></html>
     """
-    components.html(html_code, height=520)
+
+_MARKER_COLUMNS = ["latitude", "longitude", "Value", "Unit", "Location"]
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False, hash_funcs={pd.DataFrame: lambda d: pd.util.hash_pandas_object(d[_MARKER_COLUMNS]).sum()})
+def _markers_json(df: pd.DataFrame) -> str:
+    """Marker payload for the map, reused across reruns while the readings are unchanged."""
+    return (
+        df.rename(columns={"latitude": "lat", "longitude": "lng", "Location": "title"})
+        .assign(val=df["Value"].astype(str) + " " + df["Unit"])
+        .dropna(subset=["lat", "lng"])[["lat", "lng", "title", "val"]]
+        .to_json(orient="records")
+    )
+
+def _map_html(df: pd.DataFrame, center_lat: float, center_lon: float) -> str:
+    return (
+        _MAP_TEMPLATE.replace("<!--API_KEY-->", GOOGLE_MAPS_API_KEY)
+        .replace("<!--MARKERS-->", _markers_json(df))
+        .replace("<!--CENTER-->", f"{{lat:{center_lat},lng:{center_lon}}}")
+    )
+
+def render_google_map(df: pd.DataFrame, center_lat: float, center_lon: float):
+    if df.empty or not GOOGLE_MAPS_API_KEY: return
+    components.html(_map_html(df, center_lat, center_lon), height=520)
 
 # -----------------------------------------------------------------------------
 # 4. DASHBOARD UI
@@ -411,7 +700,8 @@ def render_dashboard(df: pd.DataFrame, pollutant_key: str, lat: float, lon: floa
         )
         return
 
-    avg_val = df["Value"].mean()
+    stats = df["Value"].agg(["mean", "max", "min"])
+    avg_val, max_val, min_val = stats["mean"], stats["max"], stats["min"]
     badge_html = _risk_badge(pollutant_key, avg_val)
 
     # ── Metric row ────────────────────────────────────────────��─────────────
@@ -424,13 +714,13 @@ def render_dashboard(df: pd.DataFrame, pollutant_key: str, lat: float, lon: floa
     )
     c2.markdown(
         f'<div class="metric-card"><div class="metric-label">Peak Hotspot</div>'
-        f'<div class="metric-value">{df["Value"].max():.1f}</div>'
+        f'<div class="metric-value">{max_val:.1f}</div>'
         f'<div class="metric-sub">{unit}</div></div>',
         unsafe_allow_html=True,
     )
     c3.markdown(
         f'<div class="metric-card"><div class="metric-label">Cleanest Spot</div>'
-        f'<div class="metric-value">{df["Value"].min():.1f}</div>'
+        f'<div class="metric-value">{min_val:.1f}</div>'
         f'<div class="metric-sub">{unit}</div></div>',
         unsafe_allow_html=True,
     )
@@ -451,10 +741,12 @@ def render_dashboard(df: pd.DataFrame, pollutant_key: str, lat: float, lon: floa
         )
 
     elif ai_choice == "GPT-4o Analysis":
-        with st.spinner("Querying GPT-4o for structured health insights..."):
-            ai_response_str = get_ai_insights(df, pollutant_key, "OpenAI (GPT-4o)")
+        stream_box = st.empty()
+        stream_box.caption("Querying GPT-4o for structured health insights...")
+        ai_response_str = get_ai_insights(df, pollutant_key, _OPENAI_CHOICE, placeholder=stream_box)
+        stream_box.empty()
         try:
-            ai_data = json.loads(ai_response_str)
+            ai_data = orjson.loads(ai_response_str)
             if "error" in ai_data:
                 st.error(ai_data["error"])
             else:
@@ -469,7 +761,7 @@ def render_dashboard(df: pd.DataFrame, pollutant_key: str, lat: float, lon: floa
                     f'</table></div>',
                     unsafe_allow_html=True,
                 )
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             st.error("The AI model returned invalid JSON.")
             st.code(ai_response_str, language="text")
 
@@ -531,8 +823,12 @@ def main():
 
     lat, lon, radius, pollutant, ai_choice = render_sidebar()
 
-    with st.spinner("Fetching sensor data..."):
-        df, _ = fetch_air_quality_data(lat, lon, radius, pollutant)
+    try:
+        with st.spinner("Fetching sensor data..."):
+            df, _ = fetch_air_quality_data(lat, lon, radius, pollutant)
+    except Exception as e:
+        st.error(f"Could not load OpenAQ data, try again shortly: {e}")
+        return
 
     render_dashboard(df, pollutant, lat, lon, ai_choice)
 